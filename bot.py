@@ -1,8 +1,19 @@
 import os
+import asyncio
 import datetime
+import enum
 import json
+import hashlib
 import logging
+import re
+import secrets
+import sqlite3
+import threading
+from collections import OrderedDict
 import urllib.parse
+from functools import lru_cache
+# typing.TypedDict ditolak pydantic (dipakai google-generativeai) di Python < 3.12
+from typing_extensions import TypedDict
 
 # Library untuk environment variables
 from dotenv import load_dotenv
@@ -11,13 +22,17 @@ from dotenv import load_dotenv
 import google.generativeai as genai
 
 # Library untuk Google Calendar
+import google_auth_httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest, build_http
 
 # Library untuk Telegram Bot
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand
+from telegram.helpers import escape_markdown
+from telegram.error import TelegramError
+from telegram.request import HTTPXRequest
 from telegram.ext import (
     Application, CommandHandler, MessageHandler,
     filters, ContextTypes, CallbackQueryHandler
@@ -30,21 +45,127 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Jika PUBLIC_URL diisi, bot berjalan dengan webhook; jika tidak, dengan long polling.
+# Di Heroku webhook hanya bisa diterima proses `web` (yang mendapat $PORT), jadi untuk
+# mode webhook jalankan web=1 worker=0, dan untuk long polling worker=1 web=0.
+PUBLIC_URL = os.getenv("PUBLIC_URL")
+PORT = int(os.getenv("PORT", "8443"))
+# Telegram mengirim secret ini di header setiap update webhook; diacak per start jika tidak diisi
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or secrets.token_urlsafe(32)
 
 genai.configure(api_key=GEMINI_API_KEY)
 
+
+class Kategori(enum.Enum):
+    """Daftar kategori jadwal yang boleh dipilih Gemini."""
+    DRONE = 'drone'
+    DRONE_FPV = 'drone fpv'
+    CINEMATIC = 'cinematic'
+    SHORT_MOVIE = 'short movie'
+    FOTO = 'foto'
+    LAINNYA = 'Lainnya'
+
+
+class ScheduleExtraction(TypedDict):
+    """Skema JSON yang wajib dikembalikan Gemini."""
+    judul: str
+    lokasi: str
+    tanggal: str
+    waktu: str
+    kategori: Kategori
+
+
+GEMINI_MODEL_NAME = 'gemini-1.5-flash'
+# Output dibatasi ke JSON sesuai skema, jadi tidak perlu membersihkan blok ```json
+_GEMINI_MODEL = genai.GenerativeModel(
+    GEMINI_MODEL_NAME,
+    generation_config={
+        'response_mime_type': 'application/json',
+        'response_schema': ScheduleExtraction,
+    }
+)
+GEMINI_MAX_ATTEMPTS = 2
+GEMINI_RETRY_DELAY = 0.5  # detik
+
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
-TOKEN_FILE = "token.json"
-CREDS_FILE = "credentials.json"
+BATCH_SIZE = 50  # Batas sub-request per batch Google API
+
+# Cache hasil parsing AI, naikkan PROMPT_VERSION setiap kali prompt diubah
+PROMPT_VERSION = "3"
+PARSE_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parse_cache.sqlite3")
+PARSE_CACHE_SIZE = 1024
+
+_PROMPT_TEMPLATE = """
+    Anda adalah asisten cerdas. Ekstrak detail dari teks berikut:
+    Tanggal referensi hari ini: {today}. Teks pengguna: "{text}"
+    Tugas Anda:
+    1. Ekstrak: judul acara (judul), lokasi (lokasi, jika ada), tanggal (tanggal, format YYYY-MM-DD), dan waktu (waktu, format 24 jam HH:MM:SS). Judul acara harus spesifik.
+    2. Tentukan kategori (kategori) dari daftar: 'drone', 'drone fpv', 'cinematic', 'short movie', 'foto', atau 'Lainnya'.
+    Gunakan 'Lainnya' jika kategori tidak cocok. Isi dengan string kosong untuk data lain yang tidak bisa ditentukan.
+    """
+
+# Jadwal ulang tahun tidak ditampilkan maupun dihapus
+_BDAY_RE = re.compile(r"happy birthday", re.IGNORECASE)
+
+# Partial response: hanya field event yang benar-benar dipakai bot
+EVENT_LIST_FIELDS = "items(id,summary,start/dateTime,start/date),nextPageToken"
+EVENT_INSERT_FIELDS = "id,summary"
+
+_MAPS_BASE = "https://www.google.com/maps/search/?"
+_TZ_JAKARTA_NAME = 'Asia/Jakarta'
+_TZ_JAKARTA = datetime.timezone(datetime.timedelta(hours=7))
+
+# Batas panjang pesan Telegram adalah 4096 karakter, sisakan sedikit ruang
+MESSAGE_CHUNK_SIZE = 4000
 
 
 # --- FUNGSI-FUNGSI UTAMA ---
 
-def get_calendar_service():
+# Cache service Google Calendar agar tidak membangun ulang & refresh token di setiap handler
+_service_cache = {"creds": None, "service": None}
+# Satu lock untuk membuat service dan me-refresh token (RLock karena pembuatan service ikut me-refresh)
+_credentials_lock = threading.RLock()
+
+
+class _LockedCredentials(Credentials):
     """
-    Fungsi otentikasi Google Calendar yang andal untuk server,
-    membangun kredensial langsung dari environment variables.
+    Credentials yang me-refresh token di dalam lock. Refresh dipicu oleh
+    AuthorizedHttp (token kedaluwarsa atau respons 401) di banyak worker
+    thread sekaligus, sehingga tanpa lock setiap thread ikut me-refresh.
+    """
+
+    def refresh(self, request):
+        stale_token = self.token
+        with _credentials_lock:
+            # Cek ulang: thread lain mungkin sudah mendapatkan token baru selama menunggu lock
+            if self.token != stale_token and self.valid:
+                return
+            super().refresh(request)
+
+
+_thread_local = threading.local()
+
+
+def _authorized_http():
     """
+    httplib2 tidak thread-safe, sedangkan request API dijalankan lewat
+    asyncio.to_thread, jadi setiap worker thread memakai objek Http sendiri
+    yang koneksinya (keep-alive) dipakai ulang antar request. Karena Http
+    dipilih saat request dibuat, request API harus dibuat di dalam worker thread.
+    """
+    http = getattr(_thread_local, "http", None)
+    if http is None:
+        # build_http memberi timeout default (60 detik) seperti Http bawaan build()
+        http = google_auth_httplib2.AuthorizedHttp(_service_cache["creds"], http=build_http())
+        _thread_local.http = http
+    return http
+
+def _build_request(http, *args, **kwargs):
+    return HttpRequest(_authorized_http(), *args, **kwargs)
+
+
+def _build_credentials() -> Credentials:
+    """Membangun objek Credentials (sekali saja) dari environment variables."""
     client_id = os.getenv("GOOGLE_CLIENT_ID")
     client_secret = os.getenv("GOOGLE_CLIENT_SECRET")
     refresh_token = os.getenv("GOOGLE_REFRESH_TOKEN")
@@ -54,88 +175,285 @@ def get_calendar_service():
         logger.error("Variabel Google OAuth (CLIENT_ID, CLIENT_SECRET, REFRESH_TOKEN) tidak ditemukan di server.")
         raise ValueError("Konfigurasi Variabel Google di server tidak lengkap.")
 
-    try:
-        # Membuat objek Credentials secara langsung dengan semua data yang dibutuhkan
-        creds = Credentials(
-            token=None,  # Access token akan di-refresh
-            refresh_token=refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=client_id,
-            client_secret=client_secret,
-            scopes=SCOPES,
-        )
+    # Membuat objek Credentials secara langsung dengan semua data yang dibutuhkan
+    return _LockedCredentials(
+        token=None,  # Access token akan di-refresh
+        refresh_token=refresh_token,
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id=client_id,
+        client_secret=client_secret,
+        scopes=SCOPES,
+    )
 
-        # Me-refresh token untuk mendapatkan access token yang valid
-        creds.refresh(Request())
-        
-        return build("calendar", "v3", credentials=creds)
+def get_calendar_service():
+    """
+    Fungsi otentikasi Google Calendar yang andal untuk server,
+    membangun kredensial langsung dari environment variables.
+    Service hanya dibuat sekali; setelah itu token di-refresh otomatis
+    oleh AuthorizedHttp (lewat _LockedCredentials) saat kedaluwarsa.
+    """
+    service = _service_cache["service"]
+    if service is not None:
+        return service
 
-    except Exception as e:
-        logger.error(f"Gagal total saat otentikasi dengan Google: {e}")
-        # Jika gagal di sini, berarti ada masalah fundamental dengan kredensial
-        raise
-
-def parse_schedule_with_ai(text: str) -> dict:
-    """Mem-parsing teks menggunakan Gemini AI."""
-    today = datetime.date.today().strftime("%Y-%m-%d")
-    prompt = f"""
-    Anda adalah asisten cerdas. Ekstrak detail dari teks berikut:
-    Tanggal referensi hari ini: {today}. Teks pengguna: "{text}"
-    Tugas Anda:
-    1. Ekstrak: judul acara, lokasi (jika ada), tanggal (format YYYY-MM-DD), dan waktu (format 24 jam HH:MM:SS). Judul acara harus spesifik.
-    2. Tentukan Kategori dari daftar: 'drone', 'drone fpv', 'cinematic', 'short movie', 'foto', atau 'Lainnya'.
-    Kembalikan HANYA format JSON yang valid. Jika tidak bisa, kembalikan JSON kosong.
+    with _credentials_lock:
+        # Cek ulang: thread lain mungkin sudah membuat service selama menunggu lock
+        service = _service_cache["service"]
+        if service is not None:
+            return service
+
+        try:
+            creds = _build_credentials()
+            # Refresh pertama memastikan kredensial benar sejak awal
+            creds.refresh(Request())
+
+            # Discovery document cukup diambil sekali saat service pertama kali dibuat
+            service = build(
+                "calendar", "v3", credentials=creds,
+                cache_discovery=False, requestBuilder=_build_request
+            )
+            _service_cache["creds"] = creds
+            _service_cache["service"] = service
+            return service
+
+        except Exception as e:
+            logger.error(f"Gagal total saat otentikasi dengan Google: {e}")
+            # Jika gagal di sini, berarti ada masalah fundamental dengan kredensial
+            raise
+
+async def get_calendar(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Mengambil service Google Calendar yang disiapkan post_init di bot_data.
+    Refresh token ditangani _LockedCredentials, jadi di sini tidak perlu dicek.
+    """
+    service = context.bot_data.get('calendar')
+    if service is None:
+        # post_init belum berhasil menyiapkan service, coba lagi di worker thread
+        service = await asyncio.to_thread(get_calendar_service)
+        context.bot_data['calendar'] = service
+    return service
+
+@lru_cache(maxsize=1)
+def _today_iso(ordinal: int) -> str:
+    """Tanggal referensi (YYYY-MM-DD), hanya diformat ulang saat hari berganti."""
+    return datetime.date.fromordinal(ordinal).isoformat()
+
+
+_parse_cache = OrderedDict()
+# Database dibuka di post_init; selama belum terbuka, cache hanya di memori
+_parse_db = None
+_parse_db_lock = threading.Lock()
+
+
+def _parse_cache_key(text: str, today: str) -> str:
+    """Kunci cache: model, versi prompt, tanggal referensi, dan teks pengguna."""
+    raw = f"{GEMINI_MODEL_NAME}|{PROMPT_VERSION}|{today}|{text}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+_KATEGORI_VALUES = frozenset(kategori.value for kategori in Kategori)
+
+def _fill_missing_fields(data):
     """
+    Skema tidak mewajibkan field apa pun, jadi Gemini boleh melewatkan field
+    (misalnya lokasi). Field yang hilang atau null dianggap tidak diketahui.
+    """
+    if isinstance(data, dict):
+        for field in ScheduleExtraction.__annotations__:
+            if data.get(field) is None:
+                data[field] = Kategori.LAINNYA.value if field == 'kategori' else ''
+    return data
+
+def _matches_schema(data) -> bool:
+    """Memastikan hasil AI berbentuk ScheduleExtraction."""
+    return (
+        isinstance(data, dict)
+        and all(isinstance(data.get(field), str) for field in ScheduleExtraction.__annotations__)
+        and data['kategori'] in _KATEGORI_VALUES
+    )
+
+def _is_valid_schedule(data) -> bool:
+    """Memastikan hasil AI memiliki data minimal untuk membuat jadwal."""
+    return _matches_schema(data) and all(data[field] for field in ('judul', 'tanggal', 'waktu'))
+
+def _open_parse_cache() -> None:
+    """Membuka database cache parsing. Dijalankan sekali dari post_init di worker thread."""
+    global _parse_db
+    db = sqlite3.connect(PARSE_CACHE_FILE, check_same_thread=False)
+    db.execute("CREATE TABLE IF NOT EXISTS parse_cache (key TEXT PRIMARY KEY, data TEXT NOT NULL)")
+    db.commit()
+    _parse_db = db
+
+def _parse_db_load(key: str):
+    """Membaca dan memvalidasi satu hasil parsing dari SQLite (di worker thread)."""
+    with _parse_db_lock:
+        row = _parse_db.execute("SELECT data FROM parse_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            data = json.loads(row[0])
+        except ValueError:
+            data = None
+        if not _is_valid_schedule(data):
+            _parse_db.execute("DELETE FROM parse_cache WHERE key = ?", (key,))
+            _parse_db.commit()
+            return None
+    return data
+
+def _parse_db_store(key: str, data: dict) -> None:
+    """Menyimpan satu hasil parsing ke SQLite (di worker thread)."""
+    with _parse_db_lock:
+        _parse_db.execute(
+            "INSERT OR REPLACE INTO parse_cache (key, data) VALUES (?, ?)", (key, json.dumps(data))
+        )
+        _parse_db.commit()
+
+def _parse_cache_remember(key: str, data: dict) -> None:
+    """Menyimpan hasil parsing ke cache memori (LRU)."""
+    _parse_cache[key] = data
+    _parse_cache.move_to_end(key)
+    if len(_parse_cache) > PARSE_CACHE_SIZE:
+        _parse_cache.popitem(last=False)
+
+async def _parse_cache_get(key: str):
+    """Mengambil hasil parsing dari memori, lalu dari SQLite."""
+    if key in _parse_cache:
+        _parse_cache.move_to_end(key)
+        return _parse_cache[key]
+    if _parse_db is None:
+        return None
+
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(prompt)
-        cleaned_response = response.text.replace("```json", "").replace("```", "").strip()
-        logger.info(f"AI Response: {cleaned_response}")
-        return json.loads(cleaned_response)
-    except Exception as e:
-        logger.error(f"Error parsing with AI: {e}")
-        return {}
+        data = await asyncio.to_thread(_parse_db_load, key)
+    except sqlite3.Error as e:
+        logger.warning(f"Gagal membaca cache parsing: {e}")
+        return None
+    if data is not None:
+        _parse_cache_remember(key, data)
+    return data
+
+async def _parse_cache_put(key: str, data: dict) -> None:
+    """Menyimpan hasil parsing ke memori dan SQLite."""
+    _parse_cache_remember(key, data)
+    if _parse_db is None:
+        return
+    try:
+        await asyncio.to_thread(_parse_db_store, key, data)
+    except sqlite3.Error as e:
+        logger.warning(f"Gagal menyimpan cache parsing: {e}")
+
+async def parse_schedule_with_ai(text: str) -> dict:
+    """Mem-parsing teks menggunakan Gemini AI, memakai cache untuk teks yang sama."""
+    today = _today_iso(datetime.date.today().toordinal())
+    cache_key = _parse_cache_key(text.strip(), today)
+    cached = await _parse_cache_get(cache_key)
+    if cached is not None:
+        logger.info("AI Response diambil dari cache.")
+        return cached
+
+    prompt = _PROMPT_TEMPLATE.format(today=today, text=text)
+    for attempt in range(1, GEMINI_MAX_ATTEMPTS + 1):
+        try:
+            response = await _GEMINI_MODEL.generate_content_async(prompt)
+            logger.info(f"AI Response: {response.text}")
+            schedule_data = _fill_missing_fields(json.loads(response.text))
+            if not _matches_schema(schedule_data):
+                raise ValueError("output tidak sesuai skema")
+        except Exception as e:
+            logger.error(f"Error parsing with AI (percobaan {attempt}): {e}")
+            if attempt == GEMINI_MAX_ATTEMPTS:
+                return {}
+            # Ulangi sekali dengan menyertakan kesalahan sebelumnya
+            prompt = f"{prompt}\n    Jawaban sebelumnya tidak valid ({e}). Kembalikan JSON sesuai skema."
+            await asyncio.sleep(GEMINI_RETRY_DELAY * attempt)
+            continue
+
+        if _is_valid_schedule(schedule_data):
+            await _parse_cache_put(cache_key, schedule_data)
+        return schedule_data
+
+
+def _utc_now_iso() -> str:
+    """Waktu sekarang (UTC) dalam format RFC 3339 untuk parameter timeMin."""
+    return datetime.datetime.now(datetime.timezone.utc).isoformat().replace('+00:00', 'Z')
+
+def _join_chunks(parts: list, limit: int = MESSAGE_CHUNK_SIZE) -> list:
+    """Menggabungkan potongan teks menjadi beberapa pesan yang tidak melebihi batas Telegram."""
+    chunks, current, size = [], [], 0
+    for part in parts:
+        if current and size + len(part) > limit:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(part)
+        size += len(part)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+def _filter_events(events: list) -> list:
+    """Membuang jadwal ulang tahun dari daftar event."""
+    return [event for event in events if not _BDAY_RE.search(event.get('summary', ''))]
 
 
 # --- HANDLER UNTUK PERINTAH TELEGRAM ---
 
+# Balasan dan keyboard statis cukup dibuat sekali
+_START_TEXT = (
+    "Halo! Saya bot penjadwalan Anda.\n"
+    "Fitur:\n"
+    "/jadwal_hari_ini - Lihat jadwal hari ini\n"
+    "/hapus_pilih - Hapus jadwal tertentu\n"
+    "/hapus_semua - Hapus semua jadwal mendatang"
+)
+
+_DELETE_ALL_TEXT = (
+    "⚠️ **PERINGATAN!** Anda yakin ingin menghapus SEMUA jadwal mendatang (selain ulang tahun)? "
+    "Aksi ini tidak bisa dibatalkan."
+)
+
+_DELETE_ALL_KEYBOARD = InlineKeyboardMarkup([[
+    InlineKeyboardButton("🔴 Ya, Hapus Semua", callback_data="confirm_delete_all"),
+    InlineKeyboardButton("Batal", callback_data="cancel_delete")
+]])
+
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handler untuk perintah /start."""
-    await update.message.reply_text(
-        "Halo! Saya bot penjadwalan Anda.\n"
-        "Fitur:\n"
-        "/jadwal_hari_ini - Lihat jadwal hari ini\n"
-        "/hapus_pilih - Hapus jadwal tertentu\n"
-        "/hapus_semua - Hapus semua jadwal mendatang"
-    )
+    await update.message.reply_text(_START_TEXT)
 
 async def get_schedule_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handler untuk /jadwal_hari_ini, dengan filter."""
     try:
-        service = get_calendar_service()
+        service = await get_calendar(context)
         tz = datetime.datetime.now().astimezone().tzinfo
         time_min = datetime.datetime.now(tz).replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
         await update.message.reply_text("Mencari jadwal...")
-        events_result = service.events().list(
-            calendarId='primary', timeMin=time_min, maxResults=20,
-            singleEvents=True, orderBy='startTime'
-        ).execute()
+        # Request dibuat di dalam worker thread agar memakai Http milik thread tersebut
+        events_result = await asyncio.to_thread(
+            lambda: service.events().list(
+                calendarId='primary', timeMin=time_min, maxResults=20,
+                singleEvents=True, orderBy='startTime',
+                fields=EVENT_LIST_FIELDS
+            ).execute()
+        )
         
-        events = events_result.get('items', [])
-        events = [event for event in events if "happy birthday" not in event.get('summary', '').lower()]
+        events = _filter_events(events_result.get('items', []))
 
         if not events:
             await update.message.reply_text("Tidak ada jadwal mendatang yang ditemukan (selain ulang tahun).")
             return
             
-        message = "🗓️ **Jadwal Anda Berikutnya:**\n\n"
+        parts = ["🗓️ *Jadwal Anda Berikutnya:*\n\n"]
         for event in events[:10]:
             start = event['start'].get('dateTime', event['start'].get('date'))
+            # fromisoformat sebelum Python 3.11 belum mengenali akhiran 'Z'
             dt_object = datetime.datetime.fromisoformat(start.replace('Z', '+00:00'))
-            local_time = dt_object.astimezone().strftime("%d %b %Y, %H:%M")
-            message += f"- **{event['summary']}**\n  _{local_time}_\n"
-            
-        await update.message.reply_text(message, parse_mode='Markdown')
+            local_time = dt_object.astimezone(tz).strftime("%d %b %Y, %H:%M")
+            parts.append(
+                f"\\- *{escape_markdown(event['summary'], version=2)}*\n"
+                f"  _{escape_markdown(local_time, version=2)}_\n"
+            )
+
+        for chunk in _join_chunks(parts):
+            await update.message.reply_text(chunk, parse_mode='MarkdownV2')
     except Exception as e:
         logger.error(f"Error getting schedule: {e}")
         await update.message.reply_text("Maaf, terjadi kesalahan saat mengambil jadwal.")
@@ -146,52 +464,64 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     user_text = update.message.text
     chat_id = update.message.chat_id
     await context.bot.send_message(chat_id, text="Oke, saya proses dulu ya...")
-    schedule_data = parse_schedule_with_ai(user_text)
+    # Parsing AI dan penyiapan service Calendar tidak saling bergantung, jadi dijalankan bersamaan
+    schedule_data, service = await asyncio.gather(
+        parse_schedule_with_ai(user_text),
+        get_calendar(context),
+        return_exceptions=True
+    )
+    if isinstance(schedule_data, Exception):
+        logger.error(f"Error parsing with AI: {schedule_data}")
+        schedule_data = {}
 
     # Cek data penting dari AI
-    if not schedule_data or 'tanggal' not in schedule_data or 'waktu' not in schedule_data:
+    if not schedule_data or not schedule_data.get('tanggal') or not schedule_data.get('waktu'):
         await context.bot.send_message(chat_id, text="Maaf, saya tidak bisa menentukan tanggal atau waktu.")
         return
 
-    # Fleksibel dalam mencari kunci judul
-    judul_acara = schedule_data.get('judul') or schedule_data.get('judul_acara')
+    judul_acara = schedule_data.get('judul')
     
     if not judul_acara:
         await context.bot.send_message(chat_id, text="Maaf, saya tidak bisa menentukan judul acara dari permintaan Anda.")
         return
 
     try:
-        service = get_calendar_service()
+        if isinstance(service, Exception):
+            raise service
         start_time_obj = datetime.datetime.fromisoformat(f"{schedule_data['tanggal']}T{schedule_data['waktu']}")
         end_time_obj = start_time_obj + datetime.timedelta(hours=1)
         
-        description = f"Kategori: {schedule_data.get('kategori', 'Lainnya')}"
+        description_lines = [f"Kategori: {schedule_data.get('kategori') or Kategori.LAINNYA.value}"]
         location = schedule_data.get('lokasi', '')
         
         if location:
-            maps_link = f"https://www.google.com/maps/search/?api=1&query={urllib.parse.quote_plus(location)}"
-            description += f"\n\n📍 Buka Lokasi di Peta: {maps_link}"
+            maps_link = _MAPS_BASE + urllib.parse.urlencode({'api': 1, 'query': location})
+            description_lines += ["", f"📍 Buka Lokasi di Peta: {maps_link}"]
             
         event = {
             'summary': judul_acara, # Menggunakan judul yang sudah ditemukan
             'location': location,
-            'description': description,
-            'start': {'dateTime': start_time_obj.isoformat(), 'timeZone': 'Asia/Jakarta'},
-            'end': {'dateTime': end_time_obj.isoformat(), 'timeZone': 'Asia/Jakarta'},
+            'description': "\n".join(description_lines),
+            'start': {'dateTime': start_time_obj.isoformat(), 'timeZone': _TZ_JAKARTA_NAME},
+            'end': {'dateTime': end_time_obj.isoformat(), 'timeZone': _TZ_JAKARTA_NAME},
         }
-        created_event = service.events().insert(calendarId='primary', body=event).execute()
-        
-        tz_jakarta = datetime.timezone(datetime.timedelta(hours=7))
-        local_start_time = start_time_obj.replace(tzinfo=tz_jakarta).strftime('%d %b %Y, %H:%M')
-        confirmation_text = (
-            f"✅ **Berhasil!** Jadwal telah ditambahkan.\n\n"
-            f"**Acara:** {created_event['summary']}\n"
-            f"**Waktu:** {local_start_time}"
+        created_event = await asyncio.to_thread(
+            lambda: service.events().insert(
+                calendarId='primary', body=event, fields=EVENT_INSERT_FIELDS
+            ).execute()
         )
+        
+        local_start_time = start_time_obj.replace(tzinfo=_TZ_JAKARTA).strftime('%d %b %Y, %H:%M')
+        confirmation_lines = [
+            "✅ **Berhasil!** Jadwal telah ditambahkan.",
+            "",
+            f"**Acara:** {created_event['summary']}",
+            f"**Waktu:** {local_start_time}",
+        ]
         if location:
-             confirmation_text += f"\n**Lokasi:** {location}"
+            confirmation_lines.append(f"**Lokasi:** {location}")
              
-        await context.bot.send_message(chat_id, text=confirmation_text, parse_mode='Markdown')
+        await context.bot.send_message(chat_id, text="\n".join(confirmation_lines), parse_mode='Markdown')
 
     except Exception as e:
         logger.error(f"Error creating calendar event: {e}")
@@ -201,15 +531,16 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 async def delete_selective_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Menampilkan daftar jadwal untuk dipilih dan dihapus, dengan filter."""
-    service = get_calendar_service()
-    now = datetime.datetime.utcnow().isoformat() + 'Z'
-    events_result = service.events().list(
-        calendarId='primary', timeMin=now, maxResults=20,
-        singleEvents=True, orderBy='startTime'
-    ).execute()
-    events = events_result.get('items', [])
-
-    events = [event for event in events if "happy birthday" not in event.get('summary', '').lower()]
+    service = await get_calendar(context)
+    now = _utc_now_iso()
+    events_result = await asyncio.to_thread(
+        lambda: service.events().list(
+            calendarId='primary', timeMin=now, maxResults=20,
+            singleEvents=True, orderBy='startTime',
+            fields=EVENT_LIST_FIELDS
+        ).execute()
+    )
+    events = _filter_events(events_result.get('items', []))
 
     if not events:
         await update.message.reply_text("Tidak ada jadwal mendatang untuk dihapus (selain ulang tahun).")
@@ -227,52 +558,99 @@ async def delete_selective_command(update: Update, context: ContextTypes.DEFAULT
 
 async def delete_all_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Meminta konfirmasi untuk menghapus semua jadwal (kecuali ulang tahun)."""
-    keyboard = [[
-        InlineKeyboardButton("🔴 Ya, Hapus Semua", callback_data="confirm_delete_all"),
-        InlineKeyboardButton("Batal", callback_data="cancel_delete")
-    ]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
     await update.message.reply_text(
-        "⚠️ **PERINGATAN!** Anda yakin ingin menghapus SEMUA jadwal mendatang (selain ulang tahun)? Aksi ini tidak bisa dibatalkan.",
-        reply_markup=reply_markup,
+        _DELETE_ALL_TEXT,
+        reply_markup=_DELETE_ALL_KEYBOARD,
         parse_mode='Markdown'
     )
 
+def _batch_delete_events(service, events):
+    """
+    Menghapus banyak jadwal lewat batch request (maks. 50 per HTTP request).
+    Mengembalikan (jumlah terhapus, apakah ada batch yang gagal terkirim).
+    """
+    count = 0
+    batch_failed = False
+
+    def on_delete(request_id, response, exception):
+        nonlocal count
+        if exception is not None:
+            logger.error(f"Could not delete event {request_id}: {exception}")
+        else:
+            count += 1
+
+    for i in range(0, len(events), BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=on_delete)
+        for event in events[i:i + BATCH_SIZE]:
+            batch.add(
+                service.events().delete(calendarId='primary', eventId=event['id']),
+                request_id=event['id']
+            )
+        try:
+            batch.execute()
+        except Exception as e:
+            # Kegagalan transport/batch: lanjutkan batch berikutnya, jumlah yang sudah terhapus tetap dilaporkan
+            logger.error(f"Batch delete failed: {e}")
+            batch_failed = True
+
+    return count, batch_failed
+
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Menangani aksi dari tombol inline."""
     query = update.callback_query
-    await query.answer()
-    
-    service = get_calendar_service()
-    
+
     if query.data.startswith("delete_event_"):
         event_id = query.data.split("delete_event_")[1]
+        # Abaikan tap ganda selama jadwal yang sama masih diproses
+        deleting = context.user_data.setdefault('_deleting', set())
+        if event_id in deleting:
+            await query.answer("Sedang diproses", show_alert=False)
+            return
+        deleting.add(event_id)
         try:
-            service.events().delete(calendarId='primary', eventId=event_id).execute()
+            await query.answer()
+            # Tombol langsung dihilangkan agar tidak bisa ditekan lagi
+            await query.edit_message_reply_markup(reply_markup=None)
+            service = await get_calendar(context)
+            await asyncio.to_thread(
+                lambda: service.events().delete(calendarId='primary', eventId=event_id).execute()
+            )
             await query.edit_message_text(text=f"Jadwal berhasil dihapus.")
         except Exception as e:
             logger.error(f"Error deleting event: {e}")
             await query.edit_message_text(text="Gagal menghapus jadwal.")
-            
-    elif query.data == "confirm_delete_all":
-        await query.edit_message_text(text="Sedang memproses, mohon tunggu...")
-        now = datetime.datetime.utcnow().isoformat() + 'Z'
-        events_result = service.events().list(
-            calendarId='primary', timeMin=now, singleEvents=True
-        ).execute()
-        events = events_result.get('items', [])
+        finally:
+            deleting.discard(event_id)
+        return
 
-        events = [event for event in events if "happy birthday" not in event.get('summary', '').lower()]
+    await query.answer()
+    
+    service = await get_calendar(context)
+    
+    if query.data == "confirm_delete_all":
+        await query.edit_message_text(text="Sedang memproses, mohon tunggu...")
+        now = _utc_now_iso()
+        try:
+            events_result = await asyncio.to_thread(
+                lambda: service.events().list(
+                    calendarId='primary', timeMin=now, singleEvents=True,
+                    fields=EVENT_LIST_FIELDS
+                ).execute()
+            )
+        except Exception as e:
+            logger.error(f"Error listing events for delete all: {e}")
+            await query.edit_message_text(text="Gagal menghapus jadwal.")
+            return
+        events = _filter_events(events_result.get('items', []))
         
-        count = 0
-        for event in events:
-            try:
-                service.events().delete(calendarId='primary', eventId=event['id']).execute()
-                count += 1
-            except Exception as e:
-                logger.error(f"Could not delete event {event['id']}: {e}")
+        count, batch_failed = await asyncio.to_thread(_batch_delete_events, service, events)
         
-        await query.edit_message_text(text=f"✅ Selesai! {count} jadwal mendatang telah dihapus.")
+        if batch_failed:
+            await query.edit_message_text(
+                text=f"⚠️ Sebagian jadwal gagal dihapus. {count} jadwal mendatang telah dihapus."
+            )
+        else:
+            await query.edit_message_text(text=f"✅ Selesai! {count} jadwal mendatang telah dihapus.")
 
     elif query.data == "cancel_delete":
         await query.edit_message_text(text="Aksi dibatalkan.")
@@ -280,20 +658,68 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 # --- FUNGSI UTAMA UNTUK MENJALANKAN BOT ---
 
+# Bot hanya menangani pesan dan tombol inline, jenis update lain tidak perlu dikirim Telegram
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+BOT_COMMANDS = [
+    BotCommand("start", "Mulai dan lihat daftar fitur"),
+    BotCommand("jadwal_hari_ini", "Lihat jadwal hari ini"),
+    BotCommand("hapus_pilih", "Hapus jadwal tertentu"),
+    BotCommand("hapus_semua", "Hapus semua jadwal mendatang"),
+]
+
+async def post_init(application: Application) -> None:
+    """Menyiapkan daftar perintah, cache parsing, dan service Google Calendar sebelum bot mulai menerima update."""
+    try:
+        await application.bot.set_my_commands(BOT_COMMANDS)
+    except TelegramError as e:
+        # Daftar perintah hanya pelengkap, bot tetap dijalankan
+        logger.warning(f"Daftar perintah bot tidak bisa didaftarkan: {e}")
+    try:
+        await asyncio.to_thread(_open_parse_cache)
+    except sqlite3.Error as e:
+        logger.warning(f"Cache parsing SQLite tidak bisa dibuka, hanya memakai cache memori: {e}")
+    try:
+        application.bot_data['calendar'] = await asyncio.to_thread(get_calendar_service)
+    except Exception:
+        # Handler akan mencoba lagi saat pertama kali dipanggil
+        logger.warning("Service Google Calendar belum bisa disiapkan saat startup.")
+
 def main() -> None:
     """Fungsi utama untuk menjalankan bot."""
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    # Update dari pengguna berbeda diproses bersamaan, handler lambat tidak menahan antrean
+    application = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        # Semua panggilan Bot API berbagi satu connection pool HTTP/2
+        .request(HTTPXRequest(connection_pool_size=256, http_version="2"))
+        .get_updates_request(HTTPXRequest(http_version="2"))
+        .concurrent_updates(True)
+        .post_init(post_init)
+        .build()
+    )
 
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("jadwal_hari_ini", get_schedule_command))
-    application.add_handler(CommandHandler("hapus_semua", delete_all_command))
-    application.add_handler(CommandHandler("hapus_pilih", delete_selective_command))
-    application.add_handler(CallbackQueryHandler(button_handler))
+    application.add_handler(CommandHandler("start", start_command, block=False))
+    application.add_handler(CommandHandler("jadwal_hari_ini", get_schedule_command, block=False))
+    application.add_handler(CommandHandler("hapus_semua", delete_all_command, block=False))
+    application.add_handler(CommandHandler("hapus_pilih", delete_selective_command, block=False))
+    application.add_handler(CallbackQueryHandler(button_handler, block=False))
     
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-
-    logger.info("Bot is running...")
-    application.run_polling()
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message, block=False))
+
+    if PUBLIC_URL:
+        logger.info("Bot is running (webhook)...")
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=PORT,
+            url_path=TELEGRAM_TOKEN,
+            webhook_url=f"{PUBLIC_URL.rstrip('/')}/{TELEGRAM_TOKEN}",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=ALLOWED_UPDATES
+        )
+    else:
+        logger.info("Bot is running (long polling)...")
+        application.run_polling(poll_interval=0.0, timeout=30, allowed_updates=ALLOWED_UPDATES)
 
 
 if __name__ == "__main__":